@@ -0,0 +1,365 @@
+"""
+Copyright 2019 by Adam Lewicki
+This file is part of the Game Theory library,
+and is released under the "MIT License Agreement". Please see the LICENSE
+file that should have been included as part of this package.
+"""
+from itertools import combinations, product
+
+from gametree import GameTree
+
+
+# ======================================================================================================================
+# normal form game object
+class NormalFormGame:
+    # ---------------------------------- OBJECT PROPERTIES -------------------------------------------------------------
+    # procedure of printing object properties
+    def __repr__(self):
+        """ return game as JSON serialized dictionary """
+        return GameTree.pretty_print({
+            'players': self.players,
+            'strategies': self.strategies,
+            'payoffs': {str(profile): payoff for profile, payoff in zip(self._profiles, self._payoffs)}
+        })
+
+    # initialize object
+    def __init__(self, players: list, strategies: list, payoffs: dict):
+        """
+        NormalFormGame class used to represent game in normal form:
+
+        Attributes
+        ----------
+        players : list
+            list of players names
+        strategies : list
+            list of pure strategies for each player, in order of players
+        payoffs : dict
+            dictionary of payoffs lists for players, keyed by tuple of strategies indexes (one index per player)
+        """
+        self.players = players
+        self.strategies = strategies
+        # flat tables of profiles and payoffs, iterated in every solver step
+        self._profiles = list(product(*[range(len(s)) for s in strategies]))
+        self._payoffs = [payoffs[profile] for profile in self._profiles]
+
+    @classmethod
+    def from_tree(cls, tree: GameTree):
+        """
+        create normal form of the game from the tree.
+
+        Pure strategy of player is a choice of move in each of information sets owned by the player -
+        group from set_group, or single node if node does not belong to any group.
+        Payoff of player is taken from leaf's value, at the position of player in tree's players list.
+        Nodes owned by player '0' are chance nodes - their children are weighted by children's probability.
+
+        :param GameTree tree: game tree
+        """
+        nodes = tree.get_tree()
+        # noinspection PyProtectedMember
+        players_list = tree._players_list
+
+        # information set of every decision node
+        infoset_of = {node: node for node in nodes if nodes[node]['children'] and nodes[node]['player'] != '0'}
+        groups = tree.get_groups()
+        for group in groups:
+            for node in groups[group]['group']:
+                if node in infoset_of:
+                    infoset_of[node] = group
+
+        # moves available in every information set
+        moves = {}
+        for node in infoset_of:
+            # order of moves is taken from the first node of information set
+            labels = list(dict.fromkeys(nodes[node]['children'].values()))
+            if set(moves.setdefault(infoset_of[node], labels)) != set(labels):
+                raise ValueError('nodes of group %s have different moves' % infoset_of[node])
+
+        # players owning information sets, in order of tree's players list
+        owners = {infoset_of[node]: nodes[node]['player'] for node in infoset_of}
+        players = [player for player in players_list if player in owners.values()]
+        infosets = [[infoset for infoset in moves if owners[infoset] == player] for player in players]
+        strategies = [
+            [dict(zip(infosets_, choice)) for choice in product(*[moves[infoset] for infoset in infosets_])]
+            for infosets_ in infosets
+        ]
+        indexes = [players_list.index(player) for player in players]
+
+        # children of every node, keyed by move
+        children = {node: {label: child for child, label in nodes[node]['children'].items()} for node in nodes}
+
+        def _get_value(node_: str, profile_: tuple) -> list:
+            if not nodes[node_]['children']:
+                return [nodes[node_]['value'][index] for index in indexes]
+            if node_ not in infoset_of:
+                total = sum(nodes[child]['probability'] for child in nodes[node_]['children'])
+                if not total:
+                    raise ValueError('children of chance node %s have total probability 0' % node_)
+                values = [0] * len(players)
+                for child in nodes[node_]['children']:
+                    weight = nodes[child]['probability'] / total
+                    values = [x + weight * y for x, y in zip(values, _get_value(child, profile_))]
+                return values
+            player = players.index(nodes[node_]['player'])
+            move = strategies[player][profile_[player]][infoset_of[node_]]
+            return _get_value(children[node_][move], profile_)
+
+        payoffs = {profile: _get_value('root', profile)
+                   for profile in product(*[range(len(s)) for s in strategies])}
+        return cls(players, strategies, payoffs)
+
+    # ---------------------------------- PAYOFFS -----------------------------------------------------------------------
+    def get_matrices(self) -> list:
+        """ return list of payoff matrices [A, B] of two players game """
+        if len(self.players) != 2:
+            raise ValueError('game has %s players, not 2' % len(self.players))
+        a = [[0] * len(self.strategies[1]) for _ in self.strategies[0]]
+        b = [[0] * len(self.strategies[1]) for _ in self.strategies[0]]
+        for (i, j), payoff in zip(self._profiles, self._payoffs):
+            a[i][j], b[i][j] = payoff[0], payoff[1]
+        return [a, b]
+
+    def get_strategy_payoffs(self, profile: list) -> list:
+        """
+        return list of expected payoffs of every pure strategy of every player,
+        when other players play mixed strategies from profile
+        :param list profile: list of mixed strategies (lists of probabilities) for players
+        """
+        n = len(self.players)
+        result = [[0] * len(s) for s in self.strategies]
+        for pure, payoff in zip(self._profiles, self._payoffs):
+            weights = [profile[i][pure[i]] for i in range(n)]
+            for i in range(n):
+                weight = 1
+                for j in range(n):
+                    if j != i:
+                        weight *= weights[j]
+                result[i][pure[i]] += weight * payoff[i]
+        return result
+
+    def get_expected_payoffs(self, profile: list) -> list:
+        """
+        return list of expected payoffs of players for mixed strategies profile
+        :param list profile: list of mixed strategies (lists of probabilities) for players
+        """
+        return [sum(map(lambda x, u: x * u, mix, payoffs))
+                for mix, payoffs in zip(profile, self.get_strategy_payoffs(profile))]
+
+    def get_regret(self, profile: list) -> float:
+        """
+        return the biggest gain any player can get by changing only own strategy - 0 for equilibrium
+        :param list profile: list of mixed strategies (lists of probabilities) for players
+        """
+        return max(max(payoffs) - sum(map(lambda x, u: x * u, mix, payoffs))
+                   for mix, payoffs in zip(profile, self.get_strategy_payoffs(profile)))
+
+    # ---------------------------------- TWO PLAYERS -------------------------------------------------------------------
+    @staticmethod
+    def _solve(matrix: list, tol: float):
+        """
+        return solution of square linear system given as augmented matrix, None if system is singular
+        :param list matrix: list of rows, last column is right side of equations
+        :param float tol: values smaller than tol are treated as 0
+        """
+        rows = [row[:] for row in matrix]
+        size = len(rows)
+        for col in range(size):
+            pivot = max(range(col, size), key=lambda r: abs(rows[r][col]))
+            if abs(rows[pivot][col]) <= tol:
+                return None
+            rows[col], rows[pivot] = rows[pivot], rows[col]
+            pivot_row = [x / rows[col][col] for x in rows[col]]
+            rows[col] = pivot_row
+            for r in range(size):
+                if r != col and rows[r][col]:
+                    factor = rows[r][col]
+                    rows[r] = [x - factor * y for x, y in zip(rows[r], pivot_row)]
+        return [row[-1] for row in rows]
+
+    def _get_support_strategy(self, matrix: list, own: tuple, other: tuple, tol: float):
+        """
+        return mixed strategy over own support, which makes every strategy from other support equally good
+        for the opponent, None if it does not exist
+        :param list matrix: payoffs of the opponent, rows are own strategies
+        :param tuple own: own support
+        :param tuple other: support of the opponent
+        :param float tol: tolerance of comparisons
+        """
+        # equations: payoffs of opponent's strategies are equal to v, probabilities sum to 1
+        equations = [[matrix[i][j] for i in own] + [-1, 0] for j in other]
+        equations.append([1] * len(own) + [0, 1])
+        solution = self._solve(equations, tol)
+        if solution is None or min(solution[:-1]) < -tol:
+            return None
+        strategy = [0] * len(matrix)
+        for i, probability in zip(own, solution[:-1]):
+            strategy[i] = max(probability, 0)
+        return strategy
+
+    def support_enumeration(self, tol: float = 1e-9) -> list:
+        """
+        return list of all equilibria of nondegenerate two players game, found by support enumeration
+        :param float tol: tolerance of comparisons
+        """
+        a, b = self.get_matrices()
+        a_t = [list(column) for column in zip(*a)]
+        m, n = len(a), len(a_t)
+        result = []
+        for size in range(1, min(m, n) + 1):
+            for rows in combinations(range(m), size):
+                for cols in combinations(range(n), size):
+                    x = self._get_support_strategy(b, rows, cols, tol)
+                    if x is None:
+                        continue
+                    y = self._get_support_strategy(a_t, cols, rows, tol)
+                    if y is None:
+                        continue
+                    if self.get_regret([x, y]) <= tol:
+                        result.append([x, y])
+        return result
+
+    def lemke_howson(self, initial_dropped_label: int = 0, tol: float = 1e-9) -> list:
+        """
+        return one equilibrium of two players game, found by Lemke-Howson algorithm.
+        Ties of ratio test are broken lexicographically, so degenerate games do not make it cycle;
+        ValueError is raised if it returns to visited pair of bases anyway.
+        :param int initial_dropped_label: label dropped at start - strategy index,
+            first player's strategies come first, then second player's strategies
+        :param float tol: tolerance of comparisons
+        """
+        a, b = self.get_matrices()
+        m, n = len(a), len(a[0])
+        if not 0 <= initial_dropped_label < m + n:
+            raise ValueError('label %s does not exist' % initial_dropped_label)
+
+        # make payoffs positive, it does not change equilibria
+        shift_a = 1 - min(min(row) for row in a)
+        shift_b = 1 - min(min(row) for row in b)
+
+        # tableaux of both polytopes - labels 0..m-1 are first player's strategies, m..m+n-1 second player's
+        # first player: x variables have labels 0..m-1, slacks of B^T x <= 1 have labels m..m+n-1
+        tableau_x = [[b[i][j] + shift_b for i in range(m)] + [1 if k == j else 0 for k in range(n)] + [1]
+                     for j in range(n)]
+        basis_x = [m + j for j in range(n)]
+        # second player: slacks of A y <= 1 have labels 0..m-1, y variables have labels m..m+n-1
+        tableau_y = [[1 if k == i else 0 for k in range(m)] + [a[i][j] + shift_a for j in range(n)] + [1]
+                     for i in range(m)]
+        basis_y = list(range(m))
+
+        def _pivot(tableau: list, basis: list, initial: list, entering: int) -> int:
+            # lexicographic ratio test - right side first, then columns of initial basis (inverse of basis)
+            rows = [r for r in range(len(tableau)) if tableau[r][entering] > tol]
+            for col in [-1] + initial:
+                ratios = {r: tableau[r][col] / tableau[r][entering] for r in rows}
+                lowest = min(ratios.values())
+                rows = [r for r in rows if ratios[r] <= lowest + tol]
+                if len(rows) == 1:
+                    break
+            row = rows[0]
+            pivot_row = [x / tableau[row][entering] for x in tableau[row]]
+            tableau[row] = pivot_row
+            for r in range(len(tableau)):
+                if r != row and tableau[r][entering]:
+                    factor = tableau[r][entering]
+                    tableau[r] = [x - factor * y for x, y in zip(tableau[r], pivot_row)]
+            leaving, basis[row] = basis[row], entering
+            return leaving
+
+        tableaux = [(tableau_x, basis_x, basis_x[:]), (tableau_y, basis_y, basis_y[:])]
+        turn = 0 if initial_dropped_label < m else 1
+        label = _pivot(*tableaux[turn], initial_dropped_label)
+        visited = set()
+        while label != initial_dropped_label:
+            state = (turn, frozenset(basis_x), frozenset(basis_y))
+            if state in visited:
+                raise ValueError('Lemke-Howson cycles from label %s' % initial_dropped_label)
+            visited.add(state)
+            turn = 1 - turn
+            label = _pivot(*tableaux[turn], label)
+
+        def _get_strategy(tableau: list, basis: list, labels: range) -> list:
+            strategy = [0] * len(labels)
+            for row, label_ in zip(tableau, basis):
+                if label_ in labels:
+                    strategy[label_ - labels[0]] = row[-1]
+            total = sum(strategy)
+            return [x / total for x in strategy]
+
+        return [_get_strategy(tableau_x, basis_x, range(m)), _get_strategy(tableau_y, basis_y, range(m, m + n))]
+
+    # ---------------------------------- N PLAYERS ---------------------------------------------------------------------
+    def _check_regret(self, profile: list, iterations: int, tol: float) -> list:
+        """
+        return profile found by iterative method, raise ValueError if its regret is bigger than tol
+        :param list profile: list of mixed strategies (lists of probabilities) for players
+        :param int iterations: number of iterations method made
+        :param float tol: accepted regret of result
+        """
+        regret = self.get_regret(profile)
+        if regret > tol:
+            raise ValueError('no equilibrium with regret %s found in %s iterations, regret is %s' % (
+                tol, iterations, regret))
+        return profile
+
+    def fictitious_play(self, iterations: int = 10000, tol: float = 1e-3) -> list:
+        """
+        return approximate equilibrium - empirical frequencies of best responses played against each other.
+        Stops when regret drops to tol, raises ValueError if it does not happen within iterations.
+        :param int iterations: maximal number of iterations
+        :param float tol: accepted regret of result
+        """
+        counts = [[0] * len(s) for s in self.strategies]
+        for counts_ in counts:
+            counts_[0] = 1
+        profile = [[x / sum(c) for x in c] for c in counts]
+        for _ in range(iterations):
+            payoffs = self.get_strategy_payoffs(profile)
+            mixed = [sum(map(lambda x, u: x * u, mix, p)) for mix, p in zip(profile, payoffs)]
+            if max(max(p) - v for p, v in zip(payoffs, mixed)) <= tol:
+                return profile
+            for counts_, payoffs_ in zip(counts, payoffs):
+                counts_[payoffs_.index(max(payoffs_))] += 1
+            profile = [[x / sum(c) for x in c] for c in counts]
+        return self._check_regret(profile, iterations, tol)
+
+    def replicator_dynamics(self, iterations: int = 10000, step: float = 0.1, tol: float = 1e-3) -> list:
+        """
+        return approximate equilibrium found by discrete replicator dynamics started from uniform strategies.
+        Stops when regret drops to tol, raises ValueError if it does not happen within iterations.
+        :param int iterations: maximal number of iterations
+        :param float step: size of single step
+        :param float tol: accepted regret of result
+        """
+        profile = [[1 / len(s)] * len(s) for s in self.strategies]
+        for _ in range(iterations):
+            payoffs = self.get_strategy_payoffs(profile)
+            mixed = [sum(map(lambda x, u: x * u, mix, p)) for mix, p in zip(profile, payoffs)]
+            if max(max(p) - v for p, v in zip(payoffs, mixed)) <= tol:
+                break
+            # growth of strategy is proportional to its advantage over mixed strategy
+            profile = [[x * (1 + step * (u - v)) for x, u in zip(mix, p)]
+                       for mix, p, v in zip(profile, payoffs, mixed)]
+            profile = [[max(x, 0) / sum(max(y, 0) for y in mix) for x in mix] for mix in profile]
+        return self._check_regret(profile, iterations, tol)
+    # ==================================================================================================================
+
+
+# EXAMPLE USAGE OF NORMAL FORM GAME:
+if __name__ == '__main__':
+    # -------------------------------------------- INIT ----------------------------------------------------------------
+    # matching pennies - player 2 does not know choice of player 1
+    tree = GameTree()
+    tree.add_vertex('1', '2', {'root': 'H'})
+    tree.add_vertex('2', '2', {'root': 'T'})
+    tree.add_leaf('3', [1, -1], {'1': 'h'})
+    tree.add_leaf('4', [-1, 1], {'1': 't'})
+    tree.add_leaf('5', [-1, 1], {'2': 'h'})
+    tree.add_leaf('6', [1, -1], {'2': 't'})
+    tree.set_group('B1', '2', ['1', '2'])
+
+    game = NormalFormGame.from_tree(tree)
+    # -------------------------------------------- TESTS ---------------------------------------------------------------
+    print('normal form of the game:\n%s\n' % game)
+    print('support enumeration:\n%s\n' % game.support_enumeration())
+    print('Lemke-Howson:\n%s\n' % game.lemke_howson())
+    print('fictitious play:\n%s\n' % game.fictitious_play(tol=1e-2))
+    print('replicator dynamics:\n%s\n' % game.replicator_dynamics(tol=1e-2))
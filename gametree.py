@@ -5,7 +5,9 @@ and is released under the "MIT License Agreement". Please see the LICENSE
 file that should have been included as part of this package.
 """
 import json
+import sys
 from operator import add
+from xml.sax.saxutils import escape, quoteattr
 
 
 # ======================================================================================================================
@@ -15,7 +17,7 @@ class GameTree:
     # procedure of printing object properties
     def __repr__(self):
         """ return tree as JSON serialized dictionary """
-        return self.pretty_print(self.__dict__)
+        return self.pretty_print({key: value for key, value in self.__dict__.items() if key != '_players_index'})
 
     @staticmethod
     def pretty_print(dictionary: dict):
@@ -73,7 +75,11 @@ class GameTree:
         self._groups = {} if groups is None else groups
         # dictionary of leafs
         self._leafs = [] if leafs is None else leafs
-        self._players_list = [] if players_list is None else players_list
+        self._players_list = [] if players_list is None else players_list[:]
+        # lookup table of players indexes in players list - first position of player, as in list.index
+        self._players_index = {}
+        for index, player in enumerate(self._players_list):
+            self._players_index.setdefault(player, index)
 
         # always add root
         self.add_node({
@@ -111,8 +117,7 @@ class GameTree:
             if node['branch'].get('probability') is None else node['branch']['probability']
 
         # add player to the list of players if he is not there already
-        if node['player'] not in self._players_list:
-            self._players_list.append(node['player'])
+        self._add_player(node['player'])
 
         # add parenthood
         for parent in node['parents']:
@@ -133,7 +138,7 @@ class GameTree:
         node['branch']['probability'] = branch_probability * node['probability']
 
         # validate against the error of node not being connected to the rest of the tree via parents removal:
-        if id_ is not 'root' and not node['parents']:
+        if id_ != 'root' and not node['parents']:
             raise ValueError('node [%s] is not connected to the tree - parents are empty' % id_)
 
         # add node
@@ -194,15 +199,25 @@ class GameTree:
         del node['id']
         for attribute in node:
             self._nodes[id_][attribute] = node[attribute]
+        self._add_player(self._nodes[id_].get('player', '0'))
 
     # ---------------------------------- OBJECT BASIC METHODS ----------------------------------------------------------
     def get_parent(self, id_) -> str:
         """ get id of the parent node """
         return list(self._nodes[id_]['parents'].keys())[0]
 
+    def _add_player(self, player: str):
+        """ add player to the list of players and to the lookup table of indexes, unless it is there already """
+        if player not in self._players_index:
+            self._players_index[player] = len(self._players_list)
+            self._players_list.append(player)
+
     def get_player_index(self, id_) -> int:
         """ return player index from players list order """
-        return self._players_list.index(self._nodes[id_]['player'])
+        try:
+            return self._players_index[self._nodes[id_]['player']]
+        except KeyError:
+            raise ValueError('player of node %s is not in players list' % id_)
 
     def get_path_to_node(self, id_: str, mode: str = 'nodes') -> list:
         """
@@ -214,7 +229,7 @@ class GameTree:
         path_t = []
         node = id_
 
-        while node is not 'root':
+        while node != 'root':
             if mode == 'nodes':
                 path_t.insert(0, node)
             elif mode == 'moves':
@@ -275,6 +290,374 @@ class GameTree:
         """ return list of all groups id's where player is the owner """
         return [group for group in self._groups if self._groups[group]['player'] == player]
 
+    # ---------------------------------- VALIDATION --------------------------------------------------------------------
+    def _get_tree_order(self) -> list:
+        """
+        return list of ids of nodes, ordered so that every node follows all of its parents.
+        Only connections present in both parent and child are followed, nodes in cycles and below them are left out.
+        """
+        waiting = {}
+        for id_, node in self._nodes.items():
+            waiting[id_] = len([parent for parent in node.get('parents', {})
+                                if id_ in self._nodes.get(parent, {}).get('children', {})])
+        order = [id_ for id_ in waiting if waiting[id_] == 0]
+        for id_ in order:
+            for child in self._nodes[id_].get('children', {}):
+                if id_ in self._nodes.get(child, {}).get('parents', {}):
+                    waiting[child] -= 1
+                    if waiting[child] == 0:
+                        order.append(child)
+        return order
+
+    def validate(self, tolerance: float = 1e-9) -> list:
+        """
+        return list of all inconsistencies of tree, empty list means tree is valid.
+        Every inconsistency is dictionary with keys:
+        'error' - type of error, 'id' - id of node or group, 'message' - description of error.
+        :param float tolerance: accepted difference of stored and calculated branch probability
+        """
+        errors = []
+
+        def _error(error_: str, id_: str, message_: str):
+            errors.append({'error': error_, 'id': id_, 'message': message_})
+
+        if 'root' not in self._nodes:
+            _error('missing_root', 'root', 'tree has no root')
+
+        # nodes and their connections
+        for id_, node in self._nodes.items():
+            missing = [key for key in ('player', 'value', 'parents', 'children', 'probability', 'branch', 'depth')
+                       if key not in node]
+            if missing:
+                _error('missing_attribute', id_, 'node %s has no attributes %s' % (id_, missing))
+            if id_ != 'root' and not node.get('parents'):
+                _error('no_parents', id_, 'node %s is not connected to the tree - parents are empty' % id_)
+            for parent, label in node.get('parents', {}).items():
+                if parent not in self._nodes:
+                    _error('missing_parent', id_, 'parent %s of node %s does not exist' % (parent, id_))
+                elif id_ not in self._nodes[parent].get('children', {}):
+                    _error('missing_child_link', id_, 'node %s is not a child of its parent %s' % (id_, parent))
+                elif self._nodes[parent]['children'][id_] != str(label):
+                    _error('label_mismatch', id_, 'move from %s to %s is %s in parents and %s in children' % (
+                        parent, id_, label, self._nodes[parent]['children'][id_]))
+            for child in node.get('children', {}):
+                if child not in self._nodes:
+                    _error('missing_child', id_, 'child %s of node %s does not exist' % (child, id_))
+                elif id_ not in self._nodes[child].get('parents', {}):
+                    _error('missing_parent_link', id_, 'node %s is not a parent of its child %s' % (id_, child))
+            moves = set()
+            for move in node.get('children', {}).values():
+                if move in moves:
+                    _error('duplicate_move', id_, 'move %s leads from node %s to more than one child' % (move, id_))
+                moves.add(move)
+
+        # cycles, reachability and derived attributes, calculated in the same way as in add_node
+        order = self._get_tree_order()
+        reached = set()
+        depth = {}
+        probability = {}
+        for id_ in order:
+            node = self._nodes[id_]
+            parents = list(node.get('parents', {}).keys())
+            if id_ == 'root' or [parent for parent in parents if parent in reached]:
+                reached.add(id_)
+            if parents and parents[0] not in depth:
+                continue
+            depth[id_] = depth[parents[0]] + 1 if parents else 0
+            probability[id_] = sum(probability.get(parent, 0) for parent in parents) * node.get('probability', 1)
+            if 'depth' in node and node['depth'] != depth[id_]:
+                _error('stale_depth', id_, 'depth of node %s is %s, should be %s' % (id_, node['depth'], depth[id_]))
+            stored = node.get('branch', {}).get('probability', 0)
+            if abs(stored - probability[id_]) > tolerance:
+                _error('stale_probability', id_, 'branch probability of node %s is %s, should be %s' % (
+                    id_, stored, probability[id_]))
+        ordered = set(order)
+        for id_ in self._nodes:
+            if id_ not in ordered:
+                _error('cycle', id_, 'node %s lies on a cycle or below it' % id_)
+            elif id_ not in reached:
+                _error('unreachable', id_, 'node %s can not be reached from root' % id_)
+
+        # groups
+        for group in self._groups:
+            for node in self._groups[group]['group']:
+                if node not in self._nodes:
+                    _error('missing_group_member', group, 'member %s of group %s does not exist' % (node, group))
+        return errors
+
+    def repair(self) -> list:
+        """
+        repair tree and return list of inconsistencies which could not be repaired (see validate).
+
+        Attributes shared between nodes by copy_node are copied, connections to missing nodes and connections
+        present only in parent or only in child are removed - repair never adds connections to the game.
+        Depth and branch probability are calculated anew and missing members are removed from groups.
+        Moves differing in parent and child, duplicate moves, cycles and nodes left without parents
+        are not repaired, as it is not known which connection is right.
+        """
+        # copy attributes shared between nodes and set missing ones
+        seen = set()
+        for node in self._nodes.values():
+            node.setdefault('player', '0')
+            node.setdefault('value', [0, 0])
+            node.setdefault('probability', 1)
+            for key in ('parents', 'children', 'branch'):
+                if id(node.get(key)) in seen:
+                    node[key] = dict(node[key])
+                seen.add(id(node.setdefault(key, {})))
+
+        # remove broken connections - both sides are checked before anything is removed
+        broken = []
+        for id_, node in self._nodes.items():
+            for parent in node['parents']:
+                if id_ not in self._nodes.get(parent, {}).get('children', {}):
+                    broken.append((node['parents'], parent))
+            for child in node['children']:
+                if id_ not in self._nodes.get(child, {}).get('parents', {}):
+                    broken.append((node['children'], child))
+        for connections, id_ in broken:
+            del connections[id_]
+
+        # calculate derived attributes
+        for id_ in self._get_tree_order():
+            node = self._nodes[id_]
+            parents = list(node['parents'].keys())
+            node['depth'] = self._nodes[parents[0]]['depth'] + 1 if parents else 0
+            node['branch']['probability'] = \
+                sum(self._nodes[parent]['branch']['probability'] for parent in parents) * node['probability']
+
+        # remove missing members of groups
+        for group in self._groups:
+            self._groups[group]['group'] = [node for node in self._groups[group]['group'] if node in self._nodes]
+        return self.validate()
+
+    # ---------------------------------- SUBGAMES ----------------------------------------------------------------------
+    def _get_descendants(self, id_: str, max_depth: int = None) -> list:
+        """
+        return list of ids of node and all nodes reachable from it, ordered so that every node follows its parents.
+        Children missing from tree are skipped.
+        :param str id_: id of the top node
+        :param int max_depth: depth of the deepest returned nodes, deeper nodes are not visited; None means no limit
+        """
+        if id_ not in self._nodes:
+            raise ValueError('node %s does not exist' % id_)
+
+        def _get_children(node_: str) -> list:
+            if max_depth is not None and self._nodes[node_]['depth'] >= max_depth:
+                return []
+            return [child for child in self._nodes[node_]['children']
+                    if child in self._nodes and (max_depth is None or self._nodes[child]['depth'] <= max_depth)]
+
+        # collect reachable nodes, counting connections leading to every node from reachable part of tree
+        reachable = [id_]
+        waiting = {id_: 0}
+        for node in reachable:
+            for child in _get_children(node):
+                if child not in waiting:
+                    waiting[child] = 0
+                    reachable.append(child)
+                waiting[child] += 1
+
+        # order them so that node is placed after all of its parents from reachable part of tree
+        order = [id_]
+        for node in order:
+            for child in _get_children(node):
+                waiting[child] -= 1
+                if waiting[child] == 0 and child != id_:
+                    order.append(child)
+        return order
+
+    def _build_tree(self, id_: str, order: list, cut: set = None, leaf_value_fn=None):
+        """
+        return new GameTree planted at node id_, made only of nodes from order list.
+        Node id_ is renamed to 'root', derived attributes are recalculated by add_node.
+        :param str id_: id of node becoming root of new tree
+        :param list order: list of nodes ids, every node has to follow its parents
+        :param set cut: ids of nodes which lose their children and become leafs
+        :param leaf_value_fn: function returning value for node from cut set, None keeps node's own value
+        """
+        kept = set(order)
+        cut = set() if cut is None else cut
+
+        def _rename(node_):
+            return 'root' if node_ == id_ else node_
+
+        tree = GameTree(nodes={}, players_list=self._players_list)
+        for node in order:
+            # copy own attributes, values are shared with this tree
+            new_node = {key: value for key, value in self._nodes[node].items()
+                        if key not in ('parents', 'children', 'branch', 'depth')}
+            new_node['id'] = _rename(node)
+            new_node['parents'] = {} if node == id_ else {
+                _rename(parent): value for parent, value in self._nodes[node]['parents'].items() if parent in kept
+            }
+            if node in cut and leaf_value_fn is not None:
+                new_node['value'] = leaf_value_fn(node)
+            tree.add_node(new_node)
+
+        # filter groups to the members that remain
+        for group in self._groups:
+            members = [_rename(node) for node in self._groups[group]['group'] if node in kept]
+            if members:
+                tree.set_group(group, self._groups[group]['player'], members)
+        return tree
+
+    def subgame(self, id_: str):
+        """
+        return new GameTree made of node and all nodes reachable from it.
+        Node becomes 'root' of new tree, depth and branch probability are calculated anew,
+        groups are limited to remaining nodes. Values are not copied - they are shared with this tree.
+        :param str id_: id of the node you want to plant new tree at
+        """
+        return self._build_tree(id_, self._get_descendants(id_))
+
+    def truncate(self, max_depth: int, leaf_value_fn=None):
+        """
+        return new GameTree without nodes deeper than max_depth.
+        Nodes at max_depth lose their children and become leafs. Values are shared with this tree.
+        :param int max_depth: depth of the deepest nodes left in tree
+        :param leaf_value_fn: function called with id of node which became leaf, returning its new value;
+            None keeps node's own value
+        """
+        if max_depth < 0:
+            raise ValueError('max_depth has to be at least 0, got %s' % max_depth)
+        order = self._get_descendants('root', max_depth)
+        cut = {node for node in order if self._nodes[node]['depth'] == max_depth and self._nodes[node]['children']}
+        return self._build_tree('root', order, cut, leaf_value_fn)
+
+    # ---------------------------------- EXPORT ------------------------------------------------------------------------
+    # colours of players' nodes and groups, assigned in order of players list
+    COLORS = ('lightblue', 'lightpink', 'palegreen', 'khaki', 'plum', 'lightsalmon', 'lightcyan', 'wheat')
+
+    def _get_export_nodes(self, id_: str, min_depth: int, max_depth: int):
+        """
+        return iterable of ids of nodes to export and function checking if node is exported
+        :param str id_: id of top node of exported subgame
+        :param int min_depth: depth of the highest exported nodes
+        :param int max_depth: depth of the deepest exported nodes, None means no limit
+        """
+        def _in_range(node_: str) -> bool:
+            depth = self._nodes[node_]['depth']
+            return min_depth <= depth and (max_depth is None or depth <= max_depth)
+
+        if id_ == 'root':
+            return (node for node in self._nodes if _in_range(node)), _in_range
+        nodes = [node for node in self._get_descendants(id_) if _in_range(node)]
+        return nodes, set(nodes).__contains__
+
+    def _get_export_attributes(self, id_: str, groups: dict) -> dict:
+        """
+        return dictionary of attributes of exported node
+        :param str id_: id of the node
+        :param dict groups: dictionary of groups of nodes
+        """
+        node = self._nodes[id_]
+        leaf = not node['children']
+        return {
+            'label': '%s\n%s' % (id_, node['value']) if leaf else '%s (%s)' % (id_, node['player']),
+            'player': node['player'],
+            'value': node['value'],
+            'depth': node['depth'],
+            'group': groups.get(id_, ''),
+            'color': 'white' if leaf else self.COLORS[self._players_index[node['player']] % len(self.COLORS)],
+            'shape': 'box' if leaf else 'ellipse',
+        }
+
+    @staticmethod
+    def _write_chunks(file, lines, chunk_size: int):
+        """
+        write lines to file, joined in chunks
+        :param file: path of file (written in UTF-8) or file object
+        :param lines: iterable of lines
+        :param int chunk_size: number of lines written at once
+        """
+        if isinstance(file, str):
+            with open(file, 'w', encoding='utf-8') as file_:
+                return GameTree._write_chunks(file_, lines, chunk_size)
+        chunk = []
+        for line in lines:
+            chunk.append(line)
+            if len(chunk) >= chunk_size:
+                file.write('\n'.join(chunk) + '\n')
+                chunk = []
+        if chunk:
+            file.write('\n'.join(chunk) + '\n')
+
+    def export_dot(self, file, id_: str = 'root', min_depth: int = 0, max_depth: int = None, chunk_size: int = 1000):
+        """
+        write tree in DOT format, node by node, without building whole document in memory.
+        Leafs show their values, nodes are coloured by player, groups are connected with dashed lines.
+        :param file: path of file (written in UTF-8) or file object
+        :param str id_: id of top node of exported subgame, 'root' exports whole tree
+        :param int min_depth: depth of the highest exported nodes
+        :param int max_depth: depth of the deepest exported nodes, None means no limit
+        :param int chunk_size: number of lines written at once
+        """
+        def _quote(text) -> str:
+            return '"%s"' % str(text).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+        def _get_lines():
+            yield 'digraph GameTree {'
+            yield '    node [style=filled];'
+            groups = {node: group for group in self._groups for node in self._groups[group]['group']}
+            nodes, is_exported = self._get_export_nodes(id_, min_depth, max_depth)
+            for node in nodes:
+                attributes = self._get_export_attributes(node, groups)
+                yield '    %s [label=%s, shape=%s, fillcolor=%s];' % (
+                    _quote(node), _quote(attributes['label']), attributes['shape'], attributes['color'])
+                for child, move in self._nodes[node]['children'].items():
+                    # children missing from tree are skipped, see validate
+                    if child in self._nodes and is_exported(child):
+                        yield '    %s -> %s [label=%s];' % (_quote(node), _quote(child), _quote(move))
+
+            # information sets as dashed lines between members of group
+            for group in self._groups:
+                members = [node for node in self._groups[group]['group'] if node in self._nodes and is_exported(node)]
+                color = self.COLORS[self._players_index.get(self._groups[group]['player'], 0) % len(self.COLORS)]
+                for first, second in zip(members, members[1:]):
+                    yield '    %s -> %s [label=%s, style=dashed, dir=none, color=%s, constraint=false];' % (
+                        _quote(first), _quote(second), _quote(group), color)
+            yield '}'
+
+        self._write_chunks(file, _get_lines(), chunk_size)
+
+    def export_graphml(self, file, id_: str = 'root', min_depth: int = 0, max_depth: int = None,
+                       chunk_size: int = 1000):
+        """
+        write tree in GraphML format, node by node, without building whole document in memory.
+        Nodes have player, value, depth, group and colour attributes, edges have move attribute.
+        :param file: path of file (written in UTF-8) or file object
+        :param str id_: id of top node of exported subgame, 'root' exports whole tree
+        :param int min_depth: depth of the highest exported nodes
+        :param int max_depth: depth of the deepest exported nodes, None means no limit
+        :param int chunk_size: number of lines written at once
+        """
+        keys = (('player', 'node', 'string'), ('value', 'node', 'string'), ('depth', 'node', 'int'),
+                ('group', 'node', 'string'), ('color', 'node', 'string'), ('move', 'edge', 'string'))
+
+        def _get_lines():
+            yield '<?xml version="1.0" encoding="UTF-8"?>'
+            yield '<graphml xmlns="http://graphml.graphdrawing.org/xmlns">'
+            for key, domain, type_ in keys:
+                yield '  <key id="%s" for="%s" attr.name="%s" attr.type="%s"/>' % (key, domain, key, type_)
+            yield '  <graph id="GameTree" edgedefault="directed">'
+            groups = {node: group for group in self._groups for node in self._groups[group]['group']}
+            nodes, is_exported = self._get_export_nodes(id_, min_depth, max_depth)
+            for node in nodes:
+                attributes = self._get_export_attributes(node, groups)
+                yield '    <node id=%s>%s</node>' % (quoteattr(str(node)), ''.join(
+                    '<data key="%s">%s</data>' % (key, escape(str(attributes[key])))
+                    for key, domain, type_ in keys if domain == 'node'))
+                for child, move in self._nodes[node]['children'].items():
+                    # children missing from tree are skipped, see validate
+                    if child in self._nodes and is_exported(child):
+                        yield '    <edge source=%s target=%s><data key="move">%s</data></edge>' % (
+                            quoteattr(str(node)), quoteattr(str(child)), escape(str(move)))
+            yield '  </graph>'
+            yield '</graphml>'
+
+        self._write_chunks(file, _get_lines(), chunk_size)
+
     # ---------------------------------- TREE CALCULATIONS -------------------------------------------------------------
     def exp(self) -> list:
         """ return expected value of tree """
@@ -332,7 +715,8 @@ class GameTree:
                 parent_ = self.get_parent(id_)
             else:
                 parent_ = node_[0]
-            return [parent_, max(node_[1:], key=lambda x: x[self.get_player_index(id_)])]
+            index = self.get_player_index(id_)
+            return [parent_, max(node_[1:], key=lambda x: x[index])]
 
         # get leafs
         self.calculate_leafs()
@@ -355,7 +739,7 @@ class GameTree:
             previous_id = nodes[0][0]
             collection = [[previous_id]]
             for node in nodes:
-                if node[0] is previous_id:
+                if node[0] == previous_id:
                     collection[-1].append(node[-1])
                 else:
                     collection.append(node)
@@ -473,6 +857,9 @@ if __name__ == '__main__':
         'value': [3, 3]
     })
 
+    # validate tree - empty list
+    print('\ntree inconsistencies:\n%s' % tree.validate())
+
     # get group for player 1 - empty list
     print('\nget groups for player 1:\n%s' % tree.get_groups_of_player('1'))
 
@@ -512,3 +899,14 @@ if __name__ == '__main__':
     # get reversed analysis
     print('\nreversed analysis with nodes as path:\n%s' % tree.reversed_analysis(mode='nodes'))
     print('\nreversed analysis with moves as path:\n%s' % tree.reversed_analysis(mode='moves'))
+
+    # export in DOT format
+    print('\ntree in DOT format:')
+    tree.export_dot(sys.stdout)
+
+    # subgames:
+    # tree planted at node 6
+    print('\nsubgame of node 6:\n%s' % tree.subgame('6'))
+
+    # tree cut at depth 2, nodes which became leafs get value [0, 0]
+    print('\ntree truncated at depth 2:\n%s' % tree.truncate(2, leaf_value_fn=lambda id_: [0, 0]))
@@ -0,0 +1,927 @@
+"""
+Copyright 2019 by Adam Lewicki
+This file is part of the Game Theory library,
+and is released under the "MIT License Agreement". Please see the LICENSE
+file that should have been included as part of this package.
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+from operator import add
+
+from equilibrium import NormalFormGame
+from gametree import GameTree
+from server import GameTreeClient, GameTreeServer
+
+
+# ======================================================================================================================
+# reference game tree object - not connected with GameTree, so changes of GameTree can not leak into it
+class ReferenceGameTree:
+    # ---------------------------------- OBJECT PROPERTIES -------------------------------------------------------------
+    # procedure of printing object properties
+    def __repr__(self):
+        """ return tree as JSON serialized dictionary """
+        return self.pretty_print(self.__dict__)
+
+    @staticmethod
+    def pretty_print(dictionary: dict):
+        """ return pretty printed dictionary as JSON serialized object """
+        return json.dumps(dictionary, indent=4)
+
+    # initialize object
+    def __init__(self, nodes: dict = None, groups: dict = None, leafs: list = None, players_list: list = None):
+        """
+        ReferenceGameTree class - frozen copy of original GameTree, used as reference for tested calculations.
+        Only comparisons with 'root' use != instead of 'is not', root id is always the same object in harness.
+
+        GameTree class used to represent game tree:
+
+        Attributes
+        ----------
+        nodes : dict
+            dictionary of nodes;
+        groups : dict
+            dictionary of groups
+        leafs : list
+            list of leafs, calculated on demand
+        players_list: list
+            list of players names, indicating which game income from list is connected to which player
+        """
+
+        '''
+        dictionary of nodes:
+        Attributes
+        ----------
+        node : dict
+            dictionary representing node;
+
+            Attributes
+            ----------
+            value : float
+                value of node (the prize for reaching the node)
+            parents : dict
+                parents of node - can be multiple, represented by dict of ids and connection values
+            children : dict
+                children of node - can be multiple, represented by dict of ids and connection values
+            probability : float
+                probability of node - 1 means there is no random choice
+            branch : dict
+                totals of branch, to avoid tree walking
+
+                Attributes
+                ----------
+                value : float
+                    total value of branch
+                probability : float
+                    probability of reaching this node in game
+        '''
+
+        # remember to add new attributes to add_node method default values setting
+        self._nodes = {}
+        # dictionary of knowledge groups
+        self._groups = {} if groups is None else groups
+        # dictionary of leafs
+        self._leafs = [] if leafs is None else leafs
+        self._players_list = [] if players_list is None else players_list
+
+        # always add root
+        self.add_node({
+            'id': 'root',
+            'player': '1',
+        }) if nodes is None else nodes
+
+    # ---------------------------------- NODES -------------------------------------------------------------------------
+    def add_node(self, node: dict):
+        """
+        add node method. Runs basic validation before adding.
+
+        :param dict node: dictionary of node's data
+        """
+        # check if it is not overriding existing node
+        if node.get('id') is not None:
+            if node['id'] in self._nodes:
+                raise ValueError('tried to override node %s' % node['id'])
+        else:
+            raise ValueError('no id for node provided')
+
+        # append node to list
+        id_ = node['id']
+        del node['id']
+
+        # set default values for node
+        # remember to add new attributes here and in __init__ root node
+        node['player'] = '0' if node.get('player') is None else node['player']
+        node['value'] = [0, 0] if node.get('value') is None else node['value']
+        node['parents'] = {} if node.get('parents') is None else node['parents']
+        node['children'] = {} if node.get('children') is None else node['children']
+        node['probability'] = 1 if node.get('probability') is None else node['probability']
+        node['branch'] = {} if node.get('branch') is None else node['branch']
+        node['branch']['probability'] = 1 \
+            if node['branch'].get('probability') is None else node['branch']['probability']
+
+        # add player to the list of players if he is not there already
+        if node['player'] not in self._players_list:
+            self._players_list.append(node['player'])
+
+        # add parenthood
+        for parent in node['parents']:
+            # noinspection PyTypeChecker
+            self._nodes[parent]['children'][id_] = str(node['parents'][parent])
+
+        # set depth to one more than first parent
+        if node['parents']:
+            node['depth'] = self._nodes[str(list(node['parents'].keys())[0])]['depth'] + 1
+        else:
+            node['depth'] = 0 if node.get('depth') is None else node['depth']
+
+        # calculate total probability of node:
+        # total probability equals sum of probabilities of parents multiplied by probability of node
+        branch_probability = 0
+        for parent in node['parents']:
+            branch_probability += self._nodes[parent]['branch']['probability']
+        node['branch']['probability'] = branch_probability * node['probability']
+
+        # validate against the error of node not being connected to the rest of the tree via parents removal:
+        if id_ != 'root' and not node['parents']:
+            raise ValueError('node [%s] is not connected to the tree - parents are empty' % id_)
+
+        # add node
+        self._nodes[id_] = node
+
+    def add_vertex(self, id_: str, player: str, parents: dict):
+        """
+        add vertex from simplified function:
+
+        :param str id_: id of the node
+        :param str player: id of player owning the node
+        :param dict parents: dictionary of parents for the node
+        """
+        self.add_node({
+            'id': id_,
+            'player': player,
+            'parents': parents
+        })
+
+    def add_leaf(self, id_: str, value: list, parents: dict):
+        """
+        add leaf from simplified function:
+
+        :param str id_: id of the node
+        :param list value: list of node's values
+        :param dict parents: dictionary of parents for the node
+        """
+        self.add_node({
+            'id': id_,
+            'value': value,
+            'parents': parents
+        })
+
+    def copy_node(self, from_: str, to_: str):
+        """
+        create a copy of node's properties in another node
+
+        :param str from_: origin node of properties
+        :param str to_: destination node for properties
+        """
+        self._nodes[to_] = dict(self._nodes[from_])
+
+    def change_node(self, node: dict):
+        """
+        change node method. Changes attributes provided in node dictionary
+
+        :param dict node: dictionary of node's data
+        """
+        # check if it is not overriding existing node
+        if node.get('id') is not None:
+            if node['id'] not in self._nodes:
+                raise ValueError('tried to change non-existing node %s' % node['id'])
+        else:
+            raise ValueError('no id for node provided')
+
+        # change attributes
+        id_ = node['id']
+        del node['id']
+        for attribute in node:
+            self._nodes[id_][attribute] = node[attribute]
+
+    # ---------------------------------- OBJECT BASIC METHODS ----------------------------------------------------------
+    def get_parent(self, id_) -> str:
+        """ get id of the parent node """
+        return list(self._nodes[id_]['parents'].keys())[0]
+
+    def get_player_index(self, id_) -> int:
+        """ return player index from players list order """
+        return self._players_list.index(self._nodes[id_]['player'])
+
+    def get_path_to_node(self, id_: str, mode: str = 'nodes') -> list:
+        """
+        get path from root to the node
+        :param str id_: id of the node you want to reach from root
+        :param str mode: mode of return type, 'nodes' - make path with nodes id, 'moves' - make path with player choices
+        """
+
+        path_t = []
+        node = id_
+
+        while node != 'root':
+            if mode == 'nodes':
+                path_t.insert(0, node)
+            elif mode == 'moves':
+                parent_ = self.get_parent(node)
+                path_t.insert(0, self._nodes[parent_]['children'][node])
+            else:
+                raise ValueError('mode variable is not "nodes" nor "moves"')
+            node = self.get_parent(node)
+
+        if mode == 'nodes':
+            path_t.insert(0, 'root')
+        return path_t
+
+    @staticmethod
+    def _get_key(obj: dict, val: str) -> list:
+        """
+        get list of keys with specified value from obj dictionary
+        :param dict obj: chosen dictionary
+        :param str val: specified value
+        """
+        sublist = [key for (key, value) in obj.items() if value == val]
+        if sublist:
+            return sublist
+        else:
+            raise ValueError('key with value %s does not exist in %s' % (val, obj))
+
+    def get_tree(self) -> dict:
+        """ return copy of tree nodes structure dict"""
+        return dict(self._nodes)
+
+    # -------------- LEAFS -------------
+    def calculate_leafs(self):
+        """ calculate inner list of leafs ids """
+        self._leafs = [node for node in self._nodes if not self._nodes[node]['children']]
+
+    def get_leafs(self) -> list:
+        """ return list of leafs ids. Will return empty list, if calculate_leafs() has not been called earlier. """
+        return self._leafs[:]
+
+    # -------------- GROUPS ------------
+    def set_group(self, id_: str, player: str, group: list):
+        """
+        add list of ids to new group
+        :param str id_: id of group
+        :param str player: id of player owning the group
+        :param list group: list of id's you want to create group with
+        """
+        self._groups[id_] = {
+            'player': player,
+            'group': group
+        }
+
+    def get_groups(self) -> dict:
+        """ return dictionary of groups """
+        return dict(self._groups)
+
+    def get_groups_of_player(self, player: str) -> list:
+        """ return list of all groups id's where player is the owner """
+        return [group for group in self._groups if self._groups[group]['player'] == player]
+
+    # ---------------------------------- TREE CALCULATIONS -------------------------------------------------------------
+    def exp(self) -> list:
+        """ return expected value of tree """
+        # collect leafs
+        self.get_leafs()
+
+        exp = self._nodes['root']['value']
+        # calculate expected value
+        for leaf in self._leafs:
+            exp = list(map(add, exp,
+                           [x * self._nodes[leaf]['branch']['probability'] for x in self._nodes[leaf]['value']]
+                           ))
+        return [x / len(self._leafs) for x in exp]
+
+    def get_income_for_path(self, path: list, mode: str = 'nodes') -> float:
+        """
+        return income for path - 'root' should be skipped!
+        :param list path: list of id's you want to make path with
+        :param str mode: mode of search, 'nodes' - search path via nodes id, 'moves' - search path via player choices
+        """
+        if mode == 'nodes':
+            current_node = 'root'
+            for node in path:
+                if node not in self._nodes[current_node]['children']:
+                    raise IndexError('could not find connection from %s to %s' % (current_node, node))
+                else:
+                    current_node = '%s' % node
+
+        elif mode == 'moves':
+            current_node = 'root'
+            for val in path:
+                key = self._get_key(obj=self._nodes[current_node]['children'], val=val)
+                current_node = '%s' % key[0]
+        else:
+            raise ValueError('mode variable is not "nodes" nor "moves"')
+        return self._nodes[current_node]['value']
+
+    def get_income_for_leafs(self) -> dict:
+        """
+        return dictionary of income for leafs
+        """
+        # get leafs
+        self.calculate_leafs()
+        result = {}
+        for leaf in self._leafs:
+            result[leaf] = self._nodes[leaf]['value']
+        return result
+
+    def reversed_analysis(self, mode: str = 'nodes') -> list:
+        """ return list of path leading to optimal leaf and its value for players """
+
+        def _get_best_value_for_node(node_: list):
+            id_ = node_[0]
+            if self._nodes[id_]['parents']:
+                parent_ = self.get_parent(id_)
+            else:
+                parent_ = node_[0]
+            return [parent_, max(node_[1:], key=lambda x: x[self.get_player_index(id_)])]
+
+        # get leafs
+        self.calculate_leafs()
+
+        # fill list of parents of leafs
+        nodes = []
+
+        for leaf in self.get_leafs():
+            for parent in self._nodes[leaf]['parents']:
+                if parent not in nodes:
+                    nodes.append([parent, self._nodes[leaf]['value']])
+
+        # while the list is not reduced to root
+        while len(nodes) > 1:
+
+            # sort list of lists of nodes and their achieveable values
+            nodes.sort(key=lambda x: x[0])
+
+            # collect leafs coming from one node into one list
+            previous_id = nodes[0][0]
+            collection = [[previous_id]]
+            for node in nodes:
+                if node[0] is previous_id:
+                    collection[-1].append(node[-1])
+                else:
+                    collection.append(node)
+                previous_id = node[0]
+
+            # select best value for each node and move upward
+            for node in collection:
+                collection[collection.index(node)] = _get_best_value_for_node(node)
+
+            # replace old list with updated list
+            nodes = collection[:]
+
+        # return path to the best node and value of it
+        dict_ = self.get_income_for_leafs()
+        return [self.get_path_to_node(
+            list(dict_.keys())[list(dict_.values()).index(nodes[0][-1])], mode=mode),
+            nodes[0][-1]
+        ]
+    # ==================================================================================================================
+
+
+# ======================================================================================================================
+# id equal to given one, but always separate object - CPython shares one character strings, so copying is not enough
+class SeparateId(str):
+    pass
+
+
+# raised when reference calculation fails on tree - tree can not be used to check tested calculation
+class ReferenceInvalid(Exception):
+    pass
+
+
+# ---------------------------------- RANDOM TREES ----------------------------------------------------------------------
+def random_tree(rng: random.Random, max_depth: int, max_branching: int, players: int, ties: int,
+                separate_ids: bool = False) -> dict:
+    """
+    return description of random tree: dictionary with list of players, list of nodes and dictionary of groups.
+    Every node is dictionary with id, player, value, probability and parents, nodes follow their parents.
+    Some nodes have more than one parent, some trees have chance nodes (player '0') and information sets.
+    :param random.Random rng: random numbers generator
+    :param int max_depth: maximal depth of tree
+    :param int max_branching: maximal number of children of node
+    :param int players: number of players
+    :param int ties: number of different payoffs - small number gives many ties
+    :param bool separate_ids: build tree with equal ids being separate objects, as after loading from JSON
+    """
+    players_list = [str(player) for player in range(1, players + 1)] + ['0']
+    chance = rng.random() < 0.2
+    nodes = [{'id': 'root', 'player': '1', 'value': [0] * players, 'probability': 1, 'parents': {}}]
+    depth = {'root': 0}
+    moves = {'root': 0}
+    expanded = []
+    owner = {}
+    for node in nodes:
+        id_ = node['id']
+        if id_ != 'root' and (depth[id_] >= max_depth or rng.random() < 0.3):
+            node['player'] = '0'
+            node['value'] = [rng.randrange(ties) for _ in range(players)]
+            continue
+        expanded.append(id_)
+        owner[id_] = node['player']
+        for _ in range(rng.randint(1, max_branching)):
+            child = 'n%s' % len(nodes)
+            parents = {id_: 'abcdefghijklmnop'[moves[id_]]}
+            moves[id_] += 1
+            # second parent from already expanded nodes of the same depth
+            others = [other for other in expanded if other != id_ and depth[other] == depth[id_]]
+            if others and rng.random() < 0.15:
+                other = rng.choice(others)
+                parents[other] = 'abcdefghijklmnop'[moves[other]]
+                moves[other] += 1
+            player = '0' if chance and rng.random() < 0.3 else rng.choice(players_list[:-1])
+            nodes.append({'id': child, 'player': player, 'value': [0] * players,
+                          'probability': rng.choice([1, 1, 0.5, 0.25]), 'parents': parents})
+            depth[child] = depth[id_] + 1
+            moves[child] = 0
+
+    # information sets of nodes of one player at the same depth, with the same number of moves
+    candidates = {}
+    for id_ in expanded:
+        if owner[id_] != '0':
+            candidates.setdefault((owner[id_], depth[id_], moves[id_]), []).append(id_)
+    groups = {}
+    for (player, _, _), members in candidates.items():
+        if len(members) > 1 and rng.random() < 0.5:
+            groups['G%s' % len(groups)] = {'player': player, 'group': members}
+    return {'players': players_list, 'nodes': nodes, 'groups': groups, 'separate_ids': separate_ids}
+
+
+def build_tree(spec: dict, cls=GameTree):
+    """
+    return tree built from description
+    :param dict spec: description of tree from random_tree
+    :param cls: class of tree, GameTree or ReferenceGameTree
+    """
+    def _copy(id_: str) -> str:
+        # equal, but separate string object - 'root' stays the same object.
+        # Reference always shares ids - original GameTree compares them by identity
+        return SeparateId(id_) if spec['separate_ids'] and cls is not ReferenceGameTree and id_ != 'root' else id_
+
+    tree = cls(nodes={}, players_list=spec['players'][:])
+    for node in spec['nodes']:
+        tree.add_node({'id': _copy(node['id']), 'player': node['player'], 'value': node['value'][:],
+                       'probability': node['probability'],
+                       'parents': {_copy(parent): move for parent, move in node['parents'].items()}})
+    for group, data in spec['groups'].items():
+        tree.set_group(group, data['player'], [_copy(node) for node in data['group']])
+    return tree
+
+
+def _get_children(spec: dict) -> dict:
+    """ return dictionary of lists of children ids for every node of description """
+    children = {node['id']: [] for node in spec['nodes']}
+    for node in spec['nodes']:
+        for parent in node['parents']:
+            children[parent].append(node['id'])
+    return children
+
+
+def _filter_spec(spec: dict, keep, top: str = 'root') -> dict:
+    """
+    return description with nodes for which keep(node, parent) is True for at least one parent, or top node.
+    Connections to removed parents are dropped, top node becomes 'root', groups keep remaining members.
+    :param dict spec: description of tree
+    :param keep: function called with node id and parent id, deciding if connection stays
+    :param str top: id of node becoming root
+    """
+    kept = set()
+    nodes = []
+
+    def _rename(id_: str) -> str:
+        return 'root' if id_ == top else id_
+
+    for node in spec['nodes']:
+        if node['id'] == top:
+            parents = {}
+        else:
+            parents = {_rename(parent): move for parent, move in node['parents'].items()
+                       if parent in kept and keep(node['id'], parent)}
+            if not parents:
+                continue
+        kept.add(node['id'])
+        nodes.append(dict(node, id=_rename(node['id']), parents=parents))
+    groups = {}
+    for group, data in spec['groups'].items():
+        members = [_rename(node) for node in data['group'] if node in kept]
+        if members:
+            groups[group] = {'player': data['player'], 'group': members}
+    return dict(spec, nodes=nodes, groups=groups)
+
+
+def _get_depths(spec: dict) -> dict:
+    """ return dictionary of depths of nodes - one more than depth of first parent, as in add_node """
+    depth = {}
+    for node in spec['nodes']:
+        depth[node['id']] = depth[next(iter(node['parents']))] + 1 if node['parents'] else 0
+    return depth
+
+
+# ---------------------------------- CHECKS ----------------------------------------------------------------------------
+def _get_exp(tree) -> list:
+    """ return expected value of tree, exp uses leafs calculated earlier """
+    tree.calculate_leafs()
+    return tree.exp()
+
+
+def _get_leaf_paths(tree) -> list:
+    """ return results of get_income_for_path for paths to every leaf, via nodes and via moves """
+    tree.calculate_leafs()
+    return [[tree.get_income_for_path(tree.get_path_to_node(leaf)[1:]),
+             tree.get_income_for_path(tree.get_path_to_node(leaf, mode='moves'), mode='moves')]
+            for leaf in tree.get_leafs()]
+
+
+def _get_structure(tree) -> list:
+    """
+    return nodes, groups, result of reversed analysis and expected value of tree.
+    Reversed analysis of tree made only of root fails in reference, so it is left out for such trees.
+    """
+    if len(tree.get_tree()) == 1:
+        analysis = None
+    else:
+        analysis = _run(lambda: tree.reversed_analysis(), reference=isinstance(tree, ReferenceGameTree))[0]
+    return [tree.get_tree(), tree.get_groups(), analysis, _get_exp(tree)]
+
+
+def _compare(function):
+    """ return check calling function with reference and tested tree built from the same description """
+    def _check(spec: dict, rng: random.Random) -> list:
+        reference, tested = build_tree(spec, ReferenceGameTree), build_tree(spec)
+        return [lambda: function(reference), lambda: function(tested)]
+    return _check
+
+
+def _check_subgame(spec: dict, rng: random.Random) -> list:
+    """ compare subgame of random node with reference tree built from the part of description below that node """
+    id_ = rng.choice(spec['nodes'])['id']
+    children = _get_children(spec)
+    below = {id_}
+    for node in spec['nodes']:
+        if node['id'] in below:
+            below.update(children[node['id']])
+    reference = build_tree(_filter_spec(spec, lambda node, parent: node in below, top=id_), ReferenceGameTree)
+    tested = build_tree(spec)
+    return [lambda: _get_structure(reference), lambda: _get_structure(tested.subgame(id_))]
+
+
+def _check_truncate(spec: dict, rng: random.Random) -> list:
+    """ compare tree truncated at random depth with reference tree built from the upper part of description """
+    depth = _get_depths(spec)
+    max_depth = rng.randint(0, max(depth.values()))
+    reference = build_tree(_filter_spec(spec, lambda node, parent: depth[node] <= max_depth and
+                                        depth[parent] < max_depth), ReferenceGameTree)
+    tested = build_tree(spec)
+    return [lambda: _get_structure(reference), lambda: _get_structure(tested.truncate(max_depth))]
+
+
+def _check_repair(spec: dict, rng: random.Random) -> list:
+    """
+    compare repaired, randomly corrupted tree with reference tree. Connections present only in parent are removed
+    by repair, so reference is built without them. Copy of node made by copy_node is not connected to the tree -
+    repair has to report it, then it is removed before comparison.
+    """
+    tested = build_tree(spec)
+    nodes = tested.get_tree()
+    removed = set()
+    expected = []
+    for id_ in rng.sample(list(nodes), min(3, len(nodes))):
+        corruption = rng.randrange(6)
+        if corruption == 0:
+            tested.change_node({'id': id_, 'depth': nodes[id_]['depth'] + rng.randint(1, 3)})
+        elif corruption == 1:
+            tested.change_node({'id': id_, 'branch': {'probability': nodes[id_]['branch']['probability'] + 0.5}})
+        elif corruption == 2 and len(nodes[id_]['parents']) > 1:
+            parent = rng.choice(list(nodes[id_]['parents']))
+            del nodes[parent]['children'][id_]
+            removed.add((id_, parent))
+        elif corruption == 3:
+            nodes[id_]['children']['missing'] = 'z'
+        elif corruption == 4:
+            tested.set_group('broken', nodes[id_]['player'], [id_, 'missing'])
+        elif corruption == 5 and not expected:
+            tested.copy_node(id_, 'copy')
+            expected = [('no_parents', 'copy'), ('unreachable', 'copy')]
+    reference = build_tree(_filter_spec(spec, lambda node, parent: (node, parent) not in removed), ReferenceGameTree)
+
+    def _get_repaired() -> list:
+        errors = [(error['error'], error['id']) for error in tested.repair()]
+        # noinspection PyProtectedMember
+        tested._nodes.pop('copy', None)
+        structure = _get_structure(tested)
+        # group with missing member is not in reference
+        structure[1].pop('broken', None)
+        return [errors, structure]
+
+    return [lambda: [expected, _get_structure(reference)], _get_repaired]
+
+
+def _check_server(spec: dict, rng: random.Random) -> list:
+    """ compare answers of query server with direct calls of reference tree """
+    reference, tested = build_tree(spec, ReferenceGameTree), build_tree(spec)
+    reference.calculate_leafs()
+    # method, arguments and flag telling if reference has to succeed - reversed paths are expected to fail
+    queries = [('get_leafs', {}, True), ('reversed_analysis', {}, True), ('reversed_analysis', {'mode': 'moves'}, True),
+               ('exp', {}, True)]
+    for leaf in reference.get_leafs():
+        path = reference.get_path_to_node(leaf)
+        queries += [('get_path_to_node', {'id_': leaf}, True),
+                    ('get_path_to_node', {'id_': leaf, 'mode': 'moves'}, True),
+                    ('get_income_for_path', {'path': path[1:]}, True),
+                    ('get_income_for_path', {'path': path[:0:-1]}, False)]
+
+    def _query_reference() -> list:
+        return [_run(lambda: getattr(reference, method)(**params), reference=valid)[0]
+                for method, params, valid in queries]
+
+    async def _query_server() -> list:
+        server = GameTreeServer(tested)
+        await server.start()
+        client = GameTreeClient(port=server.port)
+        await client.connect()
+        results = await asyncio.gather(*[client.query(method, **params) for method, params, _ in queries],
+                                       return_exceptions=True)
+        await client.close()
+        await server.stop()
+        # server sends exceptions as "<type>: <message>"
+        return [('raised %s' % str(result).split(':')[0]) if isinstance(result, Exception) else result
+                for result in results]
+
+    # results of direct calls go through JSON, as answers of server do
+    return [lambda: json.loads(json.dumps(_query_reference())), lambda: asyncio.run(_query_server())]
+
+
+def _is_equilibrium(game: NormalFormGame, profile: list, tol: float = 1e-6) -> bool:
+    """ return True, if no player of two players game gains by changing only own strategy """
+    a, b = game.get_matrices()
+    x, y = profile
+    if min(x + y) < -tol or abs(sum(x) - 1) > tol or abs(sum(y) - 1) > tol:
+        return False
+    rows = [sum(a_ij * y_j for a_ij, y_j in zip(row, y)) for row in a]
+    columns = [sum(b[i][j] * x[i] for i in range(len(x))) for j in range(len(y))]
+    return max(rows) - sum(map(lambda x_i, u: x_i * u, x, rows)) <= tol and \
+        max(columns) - sum(map(lambda y_j, u: y_j * u, y, columns)) <= tol
+
+
+def _check_equilibrium(spec: dict, rng: random.Random) -> list:
+    """
+    check equilibria of two players game from tree with random real payoffs against definition of equilibrium.
+    Strategies giving the same payoffs are merged, so the game is nondegenerate.
+    """
+    # upper limit of number of strategies profiles
+    children = _get_children(spec)
+    profiles = 1
+    for node in spec['nodes']:
+        if node['player'] != '0' and children[node['id']]:
+            profiles *= len(children[node['id']])
+    if profiles > 256:
+        return [lambda: 'skipped', lambda: 'skipped']
+    spec = dict(spec, nodes=[dict(node, value=[rng.random() for _ in node['value']]) for node in spec['nodes']])
+    game = NormalFormGame.from_tree(build_tree(spec))
+    if len(game.players) != 2:
+        return [lambda: 'skipped', lambda: 'skipped']
+
+    # merge strategies giving the same payoffs
+    a, b = game.get_matrices()
+    rows = []
+    columns = []
+    seen = set()
+    for i in range(len(a)):
+        if (tuple(a[i]), tuple(b[i])) not in seen:
+            seen.add((tuple(a[i]), tuple(b[i])))
+            rows.append(i)
+    for j in range(len(a[0])):
+        if tuple((a[i][j], b[i][j]) for i in rows) not in seen:
+            seen.add(tuple((a[i][j], b[i][j]) for i in rows))
+            columns.append(j)
+    game = NormalFormGame(game.players,
+                          [[game.strategies[0][i] for i in rows], [game.strategies[1][j] for j in columns]],
+                          {(r, c): [a[i][j], b[i][j]] for r, i in enumerate(rows) for c, j in enumerate(columns)})
+    labels = range(len(rows) + len(columns))
+
+    def _test() -> list:
+        equilibria = game.support_enumeration()
+        return [_is_equilibrium(game, game.lemke_howson(label)) for label in labels] + \
+            [bool(equilibria) and all(_is_equilibrium(game, profile) for profile in equilibria)]
+
+    return [lambda: [True] * (len(labels) + 1), _test]
+
+
+# name of check: function called with description of tree and random numbers generator,
+# returning reference and tested calculations - functions without arguments
+CHECKS = {
+    'reversed_analysis': _compare(lambda tree: tree.reversed_analysis()),
+    'reversed_analysis_moves': _compare(lambda tree: tree.reversed_analysis(mode='moves')),
+    'exp': _compare(_get_exp),
+    'get_income_for_path': _compare(_get_leaf_paths),
+    'subgame': _check_subgame,
+    'truncate': _check_truncate,
+    'repair': _check_repair,
+    'server': _check_server,
+    'equilibrium': _check_equilibrium,
+}
+# checks whose reference is not a calculation, but expected result - they have no speedup
+WITHOUT_SPEEDUP = ('equilibrium',)
+
+
+def _run(function, reference: bool = False) -> list:
+    """
+    return result of function (or type of raised exception) and time of calculation
+    :param function: calculation without arguments
+    :param bool reference: True for reference calculation - its exception raises ReferenceInvalid
+    """
+    start = time.perf_counter()
+    try:
+        result = function()
+    except ReferenceInvalid:
+        raise
+    except Exception as e:
+        if reference:
+            raise ReferenceInvalid('%s: %s' % (type(e).__name__, e))
+        result = 'raised %s' % type(e).__name__
+    return [result, time.perf_counter() - start]
+
+
+def _compare_results(check: str, spec: dict, seed: int) -> list:
+    """
+    return results and times of reference and tested calculations of check for tree.
+    Raises ReferenceInvalid, if reference calculation fails.
+    """
+    reference, tested = CHECKS[check](spec, random.Random(seed))
+    return _run(reference, reference=True) + _run(tested)
+
+
+def _fails(check: str, spec: dict, seed: int) -> bool:
+    """ return True, if tested calculation disagrees with reference, which succeeds for tree """
+    try:
+        results = _compare_results(check, spec, seed)
+    except ReferenceInvalid:
+        return False
+    return results[0] != results[2]
+
+
+# ---------------------------------- SHRINKING -------------------------------------------------------------------------
+def _clean_groups(spec: dict) -> dict:
+    """ return description without groups, whose members stopped having the same moves """
+    moves = {node['id']: set() for node in spec['nodes']}
+    for node in spec['nodes']:
+        for parent, move in node['parents'].items():
+            moves[parent].add(move)
+    return dict(spec, groups={group: data for group, data in spec['groups'].items()
+                              if moves[data['group'][0]] and
+                              all(moves[node] == moves[data['group'][0]] for node in data['group'])})
+
+
+def _get_smaller_trees(spec: dict):
+    """ yield descriptions of trees smaller than spec by one step, deepest nodes first """
+    for smaller in _get_smaller_trees_with_groups(spec):
+        yield _clean_groups(smaller)
+
+
+def _get_smaller_trees_with_groups(spec: dict):
+    """ yield descriptions of trees smaller than spec by one step, groups may be left inconsistent """
+    children = _get_children(spec)
+
+    def _get_below(id_: str) -> set:
+        below = [id_]
+        for node_ in below:
+            below.extend(children[node_])
+        return set(below)
+
+    for node in reversed(spec['nodes']):
+        id_ = node['id']
+        if id_ == 'root':
+            continue
+        # remove node with all nodes below it, if all of its parents keep another child
+        removed = _get_below(id_)
+        if all(len(children[parent]) > 1 for parent in node['parents']):
+            yield _filter_spec(spec, lambda node_, parent: node_ not in removed)
+        # replace nodes below with leaf
+        if children[id_]:
+            leaf = next(n for n in spec['nodes'] if n['id'] in removed and not children[n['id']])
+            smaller = _filter_spec(spec, lambda node_, parent: node_ == id_ or node_ not in removed)
+            yield dict(smaller, nodes=[dict(n, player='0', value=leaf['value']) if n['id'] == id_ else n
+                                       for n in smaller['nodes']])
+        # remove second parents
+        if len(node['parents']) > 1:
+            first = next(iter(node['parents']))
+            yield _filter_spec(spec, lambda node_, parent: node_ != id_ or parent == first)
+        # zero payoffs of leaf
+        if not children[id_] and any(node['value']):
+            yield dict(spec, nodes=[dict(n, value=[0] * len(n['value'])) if n['id'] == id_ else n
+                                    for n in spec['nodes']])
+    # remove groups
+    for group in spec['groups']:
+        yield dict(spec, groups={key: value for key, value in spec['groups'].items() if key != group})
+
+
+def shrink(check: str, spec: dict, seed: int) -> dict:
+    """
+    return the smallest tree found, for which tested calculation still disagrees with reference
+    :param str check: name of check from CHECKS
+    :param dict spec: description of failing tree
+    :param int seed: seed of random choices of check
+    """
+    while True:
+        for smaller in _get_smaller_trees(spec):
+            if _fails(check, smaller, seed):
+                spec = smaller
+                break
+        else:
+            return spec
+
+
+# ---------------------------------- HARNESS ---------------------------------------------------------------------------
+def run(cases: int = 100, seed: int = 0, max_depth: int = 5, max_branching: int = 3, max_players: int = 3,
+        ties: int = 3, checks: list = None, separate_ids: bool = False) -> list:
+    """
+    compare tested calculations with reference on random trees and return list of reports, one per check and tree.
+    Report is dictionary with check, seed of tree, ok flag, speedup (reference time / tested time, None for checks
+    from WITHOUT_SPEEDUP) and - for failures - shrunk tree with results of both calculations.
+    Trees, for which reference calculation fails, are skipped - report has only check, seed and reason.
+    :param int cases: number of random trees
+    :param int seed: seed of the first tree, next trees use next seeds
+    :param int max_depth: maximal depth of trees
+    :param int max_branching: maximal number of children of node
+    :param int max_players: maximal number of players
+    :param int ties: number of different payoffs - small number gives many ties
+    :param list checks: names of checks from CHECKS, None runs all of them
+    :param bool separate_ids: build trees with equal ids being separate objects, as after loading from JSON
+    """
+    reports = []
+    for case in range(seed, seed + cases):
+        rng = random.Random(case)
+        spec = random_tree(rng, rng.randint(1, max_depth), rng.randint(1, max_branching),
+                           rng.randint(1, max_players), ties, separate_ids)
+        for check in CHECKS if checks is None else checks:
+            try:
+                reference_result, reference_time, tested_result, tested_time = _compare_results(check, spec, case)
+            except ReferenceInvalid as e:
+                reports.append({'check': check, 'seed': case, 'skipped': 'reference invalid - %s' % e})
+                continue
+            report = {
+                'check': check,
+                'seed': case,
+                'ok': reference_result == tested_result,
+                'speedup': None if check in WITHOUT_SPEEDUP else reference_time / tested_time if tested_time else 1.,
+            }
+            if not report['ok']:
+                report['tree'] = shrink(check, spec, case)
+                results = _compare_results(check, report['tree'], case)
+                report['reference'], report['tested'] = results[0], results[2]
+            reports.append(report)
+    return reports
+
+
+def summarize(reports: list) -> dict:
+    """
+    return dictionary of number of cases, failures, cases skipped because reference failed
+    and mean speedup per check - None for checks from WITHOUT_SPEEDUP
+    """
+    summary = {}
+    for report in reports:
+        check = summary.setdefault(report['check'], {'cases': 0, 'failures': 0, 'skipped': 0, 'speedup': None})
+        check['cases'] += 1
+        if 'skipped' in report:
+            check['skipped'] += 1
+            continue
+        check['failures'] += not report['ok']
+        if report['speedup'] is not None:
+            check['speedup'] = (check['speedup'] or 0.) + report['speedup']
+    for check in summary.values():
+        if check['speedup'] is not None:
+            check['speedup'] /= check['cases'] - check['skipped']
+    return summary
+
+
+# EXAMPLE USAGE OF HARNESS:
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='compare GameTree calculations with reference implementation')
+    parser.add_argument('--cases', type=int, default=100, help='number of random trees')
+    parser.add_argument('--seed', type=int, default=0, help='seed of the first tree')
+    parser.add_argument('--max-depth', type=int, default=5, help='maximal depth of trees')
+    parser.add_argument('--max-branching', type=int, default=3, help='maximal number of children of node')
+    parser.add_argument('--max-players', type=int, default=3, help='maximal number of players')
+    parser.add_argument('--ties', type=int, default=3, help='number of different payoffs')
+    parser.add_argument('--check', action='append', choices=list(CHECKS), help='check to run, all by default')
+    parser.add_argument('--separate-ids', action='store_true',
+                        help='build trees with equal ids being separate objects, as after loading from JSON')
+    args = parser.parse_args()
+
+    reports_ = run(args.cases, args.seed, args.max_depth, args.max_branching, args.max_players, args.ties, args.check,
+                   args.separate_ids)
+    for report_ in reports_:
+        if not report_.get('ok', True):
+            print('check %s failed for tree with seed %s, minimal failing tree:' % (report_['check'], report_['seed']))
+            print(GameTree.pretty_print(report_))
+    print(GameTree.pretty_print(summarize(reports_)))
+    raise SystemExit(any(not report_.get('ok', True) for report_ in reports_))
@@ -0,0 +1,308 @@
+"""
+Copyright 2019 by Adam Lewicki
+This file is part of the Game Theory library,
+and is released under the "MIT License Agreement". Please see the LICENSE
+file that should have been included as part of this package.
+"""
+import asyncio
+import json
+import time
+from collections import OrderedDict
+
+from gametree import GameTree
+
+
+# ======================================================================================================================
+# game tree query server object
+class GameTreeServer:
+    # methods of tree available for clients - tree is never changed by them
+    METHODS = ('get_income_for_path', 'get_path_to_node', 'get_leafs', 'reversed_analysis', 'exp')
+
+    # ---------------------------------- OBJECT PROPERTIES -------------------------------------------------------------
+    # procedure of printing object properties
+    def __repr__(self):
+        """ return server statistics as JSON serialized dictionary """
+        return GameTree.pretty_print(self.get_stats())
+
+    # initialize object
+    def __init__(self, tree: GameTree, host: str = '127.0.0.1', port: int = 0,
+                 batch_size: int = 256, cache_size: int = 65536):
+        """
+        GameTreeServer class used to answer queries about one loaded tree over socket.
+
+        Every request is one line of JSON: {"id": 1, "method": "get_path_to_node", "params": {"id_": "12"}},
+        every response is one line of JSON: {"id": 1, "result": [...]} or {"id": 1, "error": "..."}.
+        Requests waiting at the same time are answered together as one batch, identical queries are answered once.
+
+        Attributes
+        ----------
+        tree : GameTree
+            tree answering queries, leafs are calculated once at start
+        host : str
+            address of server
+        port : int
+            port of server, 0 lets system choose free port - it is available after start
+        batch_size : int
+            maximal number of requests answered in one batch
+        cache_size : int
+            maximal number of results kept in cache
+        """
+        self.host = host
+        self.port = port
+        self.batch_size = batch_size
+        self.cache_size = cache_size
+
+        self._tree = tree
+        self._tree.calculate_leafs()
+        self._cache = OrderedDict()
+        self._queue = None
+        self._server = None
+        self._worker = None
+
+        # statistics
+        self._started = None
+        self._stats = {'requests': 0, 'batches': 0, 'cache_hits': 0, 'errors': 0, 'latency_total': 0.,
+                       'latency_max': 0.}
+
+    # ---------------------------------- SERVER ------------------------------------------------------------------------
+    async def start(self):
+        """ start listening for clients """
+        self._queue = asyncio.Queue()
+        self._worker = asyncio.ensure_future(self._answer_batches())
+        self._server = await asyncio.start_server(self._handle_client, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        self._started = time.perf_counter()
+
+    async def stop(self):
+        """ stop server and close connections """
+        self._server.close()
+        await self._server.wait_closed()
+        self._worker.cancel()
+
+    async def _handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """ read requests of one client, answers are written as soon as they are ready """
+        pending = set()
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                future = asyncio.get_event_loop().create_future()
+                await self._queue.put((line, future, time.perf_counter()))
+                task = asyncio.ensure_future(self._respond(future, writer))
+                pending.add(task)
+                task.add_done_callback(pending.discard)
+            if pending:
+                await asyncio.wait(pending)
+        finally:
+            writer.close()
+
+    @staticmethod
+    async def _respond(future: asyncio.Future, writer: asyncio.StreamWriter):
+        """ write answer to the client after it is ready """
+        writer.write(await future)
+        await writer.drain()
+
+    # ---------------------------------- QUERIES -----------------------------------------------------------------------
+    async def _answer_batches(self):
+        """
+        collect waiting requests into batches and answer them.
+        Batch is answered in worker thread, so long queries do not stop reading requests and writing answers,
+        but next batch waits until previous one is answered.
+        """
+        loop = asyncio.get_event_loop()
+        while True:
+            batch = [await self._queue.get()]
+            while not self._queue.empty() and len(batch) < self.batch_size:
+                batch.append(self._queue.get_nowait())
+            self._stats['batches'] += 1
+
+            responses = await loop.run_in_executor(None, self._answer_batch, [line for line, _, _ in batch])
+            for (_, future, start), response in zip(batch, responses):
+                if not future.done():
+                    future.set_result(response)
+
+                latency = time.perf_counter() - start
+                self._stats['requests'] += 1
+                self._stats['latency_total'] += latency
+                self._stats['latency_max'] = max(self._stats['latency_max'], latency)
+
+    def _answer_batch(self, lines: list) -> list:
+        """
+        return list of JSON serialized responses for request lines, identical queries are answered once
+        :param list lines: JSON serialized requests
+        """
+        answers = {}
+        return [self._answer(line, answers) for line in lines]
+
+    def _answer(self, line: bytes, answers: dict) -> bytes:
+        """
+        return JSON serialized response for one request line - any exception becomes error response
+        :param bytes line: JSON serialized request
+        :param dict answers: results of queries already answered in current batch
+        """
+        id_ = None
+        try:
+            request = json.loads(line.decode())
+            id_ = request.get('id')
+            result = self.query(request['method'], answers=answers, **request.get('params', {}))
+            return (json.dumps({'id': id_, 'result': result}) + '\n').encode()
+        except Exception as e:
+            self._stats['errors'] += 1
+            return (json.dumps({'id': id_, 'error': '%s: %s' % (type(e).__name__, e)}, default=str) + '\n').encode()
+
+    def query(self, method: str, answers: dict = None, **params):
+        """
+        return result of tree method, taken from cache if possible
+        :param str method: name of tree method from METHODS or 'get_stats'
+        :param dict answers: results of queries already answered in current batch
+        :param params: arguments of tree method
+        """
+        if method == 'get_stats':
+            return self.get_stats()
+        if method not in self.METHODS:
+            raise ValueError('method %s is not available' % method)
+
+        key = (method, json.dumps(params, sort_keys=True))
+        if answers is not None and key in answers:
+            return answers[key]
+        if key in self._cache:
+            self._stats['cache_hits'] += 1
+            self._cache.move_to_end(key)
+            result = self._cache[key]
+        else:
+            result = getattr(self._tree, method)(**params)
+            self._cache[key] = result
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        if answers is not None:
+            answers[key] = result
+        return result
+
+    def get_stats(self) -> dict:
+        """ return dictionary of server statistics - throughput in requests per second, latency in milliseconds """
+        elapsed = 0 if self._started is None else time.perf_counter() - self._started
+        requests = self._stats['requests']
+        return {
+            'requests': requests,
+            'batches': self._stats['batches'],
+            'cache_hits': self._stats['cache_hits'],
+            'errors': self._stats['errors'],
+            'throughput': requests / elapsed if elapsed else 0,
+            'latency_mean': 1000 * self._stats['latency_total'] / requests if requests else 0,
+            'latency_max': 1000 * self._stats['latency_max'],
+        }
+    # ==================================================================================================================
+
+
+# ======================================================================================================================
+# game tree query client object
+class GameTreeClient:
+    # initialize object
+    def __init__(self, host: str = '127.0.0.1', port: int = 0):
+        """
+        GameTreeClient class used to send queries to GameTreeServer.
+        Many queries can wait for answers at the same time.
+
+        Attributes
+        ----------
+        host : str
+            address of server
+        port : int
+            port of server
+        """
+        self.host = host
+        self.port = port
+
+        self._reader = None
+        self._writer = None
+        self._listener = None
+        self._waiting = {}
+        self._last_id = 0
+
+    async def connect(self):
+        """ open connection to the server """
+        self._reader, self._writer = await asyncio.open_connection(self.host, self.port)
+        self._listener = asyncio.ensure_future(self._listen())
+
+    async def close(self):
+        """ close connection to the server """
+        self._listener.cancel()
+        self._writer.close()
+        await self._writer.wait_closed()
+
+    async def _listen(self):
+        """ pass answers from server to waiting queries """
+        while True:
+            line = await self._reader.readline()
+            if not line:
+                break
+            response = json.loads(line.decode())
+            # answers of requests which were not sent by query (unreadable requests have id null) are skipped
+            future = self._waiting.pop(response['id'], None)
+            if future is None:
+                continue
+            if 'error' in response:
+                future.set_exception(ValueError(response['error']))
+            else:
+                future.set_result(response['result'])
+
+    async def query(self, method: str, **params):
+        """
+        return result of tree method from server. Raises ValueError with message from server on failure.
+        :param str method: name of tree method
+        :param params: arguments of tree method
+        """
+        self._last_id += 1
+        future = asyncio.get_event_loop().create_future()
+        self._waiting[self._last_id] = future
+        self._writer.write((json.dumps({'id': self._last_id, 'method': method, 'params': params}) + '\n').encode())
+        await self._writer.drain()
+        return await future
+    # ==================================================================================================================
+
+
+# EXAMPLE USAGE OF GAME TREE SERVER:
+if __name__ == '__main__':
+    # -------------------------------------------- INIT ----------------------------------------------------------------
+    async def main():
+        # plant a tree
+        tree = GameTree()
+        tree.add_vertex('1', '2', {'root': 'L'})
+        tree.add_vertex('2', '2', {'root': 'P'})
+        tree.add_leaf('3', [2, 1], {'1': 'a'})
+        tree.add_leaf('4', [1, -1], {'1': 'b'})
+        tree.add_leaf('5', [1, 1], {'2': 'a'})
+        tree.add_leaf('6', [3, 3], {'2': 'b'})
+
+        server = GameTreeServer(tree)
+        await server.start()
+        client = GameTreeClient(port=server.port)
+        await client.connect()
+        # -------------------------------------------- TESTS -----------------------------------------------------------
+        # leafs
+        print('tree leafs are:\n%s\n' % await client.query('get_leafs'))
+
+        # many queries at the same time
+        results = await asyncio.gather(*[client.query('get_income_for_path', path=['2', '6']) for _ in range(100)])
+        print('tree value for path [\'2\', \'6\'] is %s\n' % results[0])
+
+        # path to node
+        print('path to node 6:\n%s\n' % await client.query('get_path_to_node', id_='6', mode='moves'))
+
+        # reversed analysis
+        print('reversed analysis:\n%s\n' % await client.query('reversed_analysis'))
+
+        # wrong path example - no connection between 1 and 6
+        try:
+            await client.query('get_income_for_path', path=['1', '6'])
+        except ValueError as e:
+            print(e, '\n')
+
+        # statistics
+        print('server statistics:\n%s' % GameTree.pretty_print(await client.query('get_stats')))
+
+        await client.close()
+        await server.stop()
+
+    asyncio.run(main())